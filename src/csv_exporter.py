@@ -3,23 +3,80 @@ CSV Data Management for TikTok Scraper
 Handles data export, formatting, and CSV file operations
 """
 
-import pandas as pd
 import csv
 import os
+import re
+from array import array
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
-from utils import logger, config, clean_text, format_number
+from utils import get_logger, get_config, clean_text, format_number, extract_video_id
+
+logger = get_logger()
+config = get_config()
+
+# Integer columns, stored as unsigned 64-bit arrays instead of lists of int objects
+COUNT_COLUMNS = ('views_count', 'likes_count', 'comments_count')
+COUNT_TYPECODE = 'Q'
+MAX_COUNT = (1 << 64) - 1
+
+# Free-text columns that may need CSV quoting; the others (numeric video ID,
+# ISO timestamp, counts) never contain commas, quotes or line breaks
+TEXT_COLUMNS = ('video_url', 'description', 'thumbnail_url', 'account_username')
+
+# Write buffer for CSV output (1 MiB, amortizes write() syscalls)
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Rendered rows handed to a single writelines() call
+WRITE_BATCH_ROWS = 4096
+
+# Same line terminator as csv.writer, so appended files stay consistent
+LINE_TERMINATOR = '\r\n'
+
+# Characters that force a CSV field to be quoted
+_NEEDS_QUOTING = re.compile(r'[,"\r\n]').search
+
+
+def _csv_field(value: Any) -> str:
+    """Render a text value as a CSV field, quoting it only when required"""
+    if value is None:
+        return ''
+    text = str(value)
+    if _NEEDS_QUOTING(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _parse_count(text: Any) -> int:
+    """Parse a TikTok counter, rejecting values a count column cannot hold"""
+    count = format_number(text)
+    if count > MAX_COUNT:
+        raise ValueError(f"Count out of range: {text}")
+    return count
+
+
+def _write_lines(csvfile, lines) -> None:
+    """Write rendered CSV lines in blocks of WRITE_BATCH_ROWS"""
+    lines = iter(lines)
+    while batch := list(islice(lines, WRITE_BATCH_ROWS)):
+        csvfile.writelines(batch)
 
 
 class CSVExporter:
     """Handles CSV export operations for TikTok data"""
     
-    def __init__(self, filename: Optional[str] = None):
+    def __init__(self, filename: Optional[str] = None, username: Optional[str] = None):
         self.filename = filename or config.csv_filename
-        self.filepath = os.path.join(config.output_dir, self.filename)
-        self.data: List[Dict[str, Any]] = []
+        self._output_dir = config.output_dir
+        self._username = username or config.tiktok_username
+        self.filepath = os.path.join(self._output_dir, self.filename)
+        self._dir_ensured = False
+        
+        # Descriptions repeat across paginated runs (reposts, pinned videos)
+        self._clean = lru_cache(maxsize=4096)(clean_text)
         
         # CSV columns
         self.columns = [
@@ -34,8 +91,149 @@ class CSVExporter:
             'account_username'
         ]
         
+        # Column-oriented storage: one list (or count array) per CSV column
+        self._cols: Dict[str, List[Any]] = {}
+        self._reset_columns()
+        
+        # Row rendering: one format string for the whole row, %d for counts
+        self._header = ','.join(self.columns) + LINE_TERMINATOR
+        self._row_format = ','.join(
+            '%d' if col in COUNT_COLUMNS else '%s' for col in self.columns
+        ) + LINE_TERMINATOR
+        
+        # Timestamp shared by every row of the current scrape batch
+        self._scraped_at: Optional[str] = None
+        
+        # Streaming output: rows go straight to the open file instead of the buffers
+        self._stream = None
+        self._streamed = 0
+        self._stream_offset = 0  # File position where this exporter's streamed rows start
+        
+        # Running totals over every added row (buffered or streamed)
+        self._sum_views = 0
+        self._sum_likes = 0
+        self._sum_comments = 0
+        
         logger.info(f"CSV exporter initialized: {self.filepath}")
     
+    def __len__(self) -> int:
+        return self._n + self._streamed
+    
+    def __enter__(self) -> 'CSVExporter':
+        self.open_stream()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close_stream()
+    
+    @property
+    def streaming(self) -> bool:
+        """Whether added videos are written to the CSV file immediately"""
+        return self._stream is not None
+    
+    def open_stream(self, append: bool = False):
+        """Open the CSV file and write every video added from now on directly to it"""
+        if self._stream is not None:
+            raise RuntimeError(f"CSV stream already open: {self.filepath}")
+        
+        try:
+            self._ensure_output_dir()
+            
+            exists = append and os.path.exists(self.filepath)
+            self._stream = open(self.filepath, 'a' if exists else 'w', newline='',
+                                encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+            
+            if not exists:
+                self._stream.write(self._header)
+            
+            # Rows already in an appended file belong to earlier runs
+            if not exists or not self._streamed:
+                self._stream_offset = self._stream.tell()
+            
+            # Move rows collected before streaming started into the file
+            if self._n:
+                _write_lines(self._stream, self._render_rows(self._cols))
+                self._streamed += self._n
+                self._reset_columns()
+            
+            logger.info(f"Streaming videos to {self.filepath}")
+            
+        except Exception as e:
+            logger.error(f"Error opening CSV stream: {str(e)}")
+            self.close_stream()
+            raise
+    
+    def close_stream(self):
+        """Flush and close the streaming CSV file"""
+        if self._stream is None:
+            return
+        
+        try:
+            self._stream.close()
+            logger.success(f"Saved {self._streamed} videos to {self.filepath}")
+        except Exception as e:
+            logger.error(f"Error closing CSV stream: {str(e)}")
+        finally:
+            self._stream = None
+            self._scraped_at = None
+    
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        """Collected videos as a list of row dicts (built on demand)"""
+        return [dict(zip(self.columns, row)) for row in self._rows()]
+    
+    def _reset_columns(self):
+        """Drop all buffered rows"""
+        self._cols = {
+            col: array(COUNT_TYPECODE) if col in COUNT_COLUMNS else []
+            for col in self.columns
+        }
+        self._n = 0
+    
+    def _ensure_output_dir(self):
+        """Create the output directory on first use"""
+        if not self._dir_ensured:
+            os.makedirs(self._output_dir, exist_ok=True)
+            self._dir_ensured = True
+    
+    def _append_row(self, row: Dict[str, Any]):
+        """Store a processed row in the column buffers"""
+        for col in self.columns:
+            self._cols[col].append(row[col])
+        self._n += 1
+    
+    def _extend_columns(self, columns: Dict[str, List[Any]], count: int):
+        """Store processed columns in the column buffers"""
+        for col in self.columns:
+            self._cols[col].extend(columns[col])
+        self._n += count
+    
+    def _add_totals(self, views: int, likes: int, comments: int):
+        """Update the running totals used by get_stats"""
+        self._sum_views += views
+        self._sum_likes += likes
+        self._sum_comments += comments
+    
+    def _rows(self):
+        """Iterate over collected rows as tuples ordered like self.columns"""
+        return zip(*(self._cols[col] for col in self.columns))
+    
+    def _render_row(self, row: Dict[str, Any]) -> str:
+        """Render a single processed row as a CSV line"""
+        return self._row_format % tuple(
+            _csv_field(row[col]) if col in TEXT_COLUMNS else row[col]
+            for col in self.columns
+        )
+    
+    def _render_rows(self, columns: Dict[str, List[Any]]):
+        """Render processed columns as CSV lines"""
+        fields = [
+            map(_csv_field, columns[col]) if col in TEXT_COLUMNS else columns[col]
+            for col in self.columns
+        ]
+        row_format = self._row_format
+        return (row_format % row for row in zip(*fields))
+    
     def add_video_data(self, video_data: Dict[str, Any]) -> bool:
         """Add video data to the collection"""
         try:
@@ -47,8 +245,20 @@ class CSVExporter:
             # Clean and format the data
             processed_data = self._process_video_data(video_data)
             
-            # Add to collection
-            self.data.append(processed_data)
+            # Add to collection (or write it out when streaming)
+            if self._stream is not None:
+                # Flushed per row so an interrupted scrape still leaves a complete CSV
+                self._stream.write(self._render_row(processed_data))
+                self._stream.flush()
+                self._streamed += 1
+            else:
+                self._append_row(processed_data)
+            
+            self._add_totals(
+                processed_data['views_count'],
+                processed_data['likes_count'],
+                processed_data['comments_count']
+            )
             logger.debug(f"Added video data: {processed_data.get('video_id', 'unknown')}")
             return True
             
@@ -56,110 +266,185 @@ class CSVExporter:
             logger.error(f"Error adding video data: {str(e)}")
             return False
     
+    def refresh_timestamp(self) -> str:
+        """Start a new scrape batch timestamp and return it"""
+        self._scraped_at = datetime.now().isoformat()
+        return self._scraped_at
+    
+    def _batch_timestamp(self) -> str:
+        """Timestamp of the current scrape batch"""
+        return self._scraped_at or self.refresh_timestamp()
+    
+    def add_videos(self, videos: List[Dict[str, Any]]) -> int:
+        """Add a batch of videos to the collection, returns the number added"""
+        try:
+            valid = [video for video in videos if video.get('video_url')]
+            if len(valid) < len(videos):
+                logger.warning(f"Skipping {len(videos) - len(valid)} videos: missing video_url")
+            
+            if not valid:
+                return 0
+            
+            # Clean and format the data one column at a time; a bad video
+            # fails the whole batch before anything is stored
+            processed_columns = self._process_video_batch(valid)
+            
+            if self._stream is not None:
+                _write_lines(self._stream, self._render_rows(processed_columns))
+                self._streamed += len(valid)
+            else:
+                self._extend_columns(processed_columns, len(valid))
+            
+            self._add_totals(
+                sum(processed_columns['views_count']),
+                sum(processed_columns['likes_count']),
+                sum(processed_columns['comments_count'])
+            )
+            logger.debug(f"Added {len(valid)} videos")
+            return len(valid)
+            
+        except Exception as e:
+            logger.error(f"Error adding video batch: {str(e)}")
+            return 0
+    
     def _process_video_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process and clean video data"""
-        processed = {
-            'video_id': self._extract_video_id(raw_data.get('video_url', '')),
-            'video_url': raw_data.get('video_url', ''),
-            'description': clean_text(raw_data.get('description', '')),
-            'thumbnail_url': raw_data.get('thumbnail_url', ''),
-            'views_count': format_number(raw_data.get('views_count', '0')),
-            'likes_count': format_number(raw_data.get('likes_count', '0')),
-            'comments_count': format_number(raw_data.get('comments_count', '0')),
-            'scraped_at': datetime.now().isoformat(),
-            'account_username': config.tiktok_username
-        }
+        columns = self._process_video_batch([raw_data])
+        return {col: values[0] for col, values in columns.items()}
+    
+    def _process_video_batch(self, videos: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """Process and clean a batch of videos into column lists"""
+        def column(key: str, default: str = '') -> List[Any]:
+            return [video.get(key, default) for video in videos]
+        
+        urls = column('video_url')
+        scraped_at = self._batch_timestamp()
         
-        return processed
+        return {
+            'video_id': list(map(self._extract_video_id, urls)),
+            'video_url': urls,
+            'description': list(map(self._clean, column('description'))),
+            'thumbnail_url': column('thumbnail_url'),
+            'views_count': list(map(_parse_count, column('views_count', '0'))),
+            'likes_count': list(map(_parse_count, column('likes_count', '0'))),
+            'comments_count': list(map(_parse_count, column('comments_count', '0'))),
+            'scraped_at': [scraped_at] * len(videos),
+            'account_username': [self._username] * len(videos)
+        }
     
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from TikTok URL"""
         if not url:
             return ""
         
-        try:
-            # Handle different TikTok URL formats
-            if "/video/" in url:
-                video_id = url.split("/video/")[1].split("?")[0]
-                return video_id
-            elif "tiktok.com" in url:
-                # Try to extract from various URL patterns
-                parts = url.split("/")
-                for part in parts:
-                    if part.isdigit() and len(part) > 10:
-                        return part
-        except Exception as e:
-            logger.debug(f"Could not extract video ID from {url}: {str(e)}")
+        video_id = extract_video_id(url)
+        if not video_id:
+            logger.debug(f"Could not extract video ID from {url}")
+            return ""
         
-        return ""
+        return video_id
     
     def save_to_csv(self, append: bool = False) -> bool:
         """Save data to CSV file"""
         try:
-            if not self.data:
+            if self._stream is not None:
+                # Rows are already written, just push them to disk
+                self._stream.flush()
+                logger.debug(f"Flushed {self._streamed} streamed videos to {self.filepath}")
+                return True
+            
+            if not self._n:
                 logger.warning("No data to save")
                 return False
             
             # Create directory if it doesn't exist
-            os.makedirs(config.output_dir, exist_ok=True)
+            self._ensure_output_dir()
             
-            # Determine file mode
-            file_mode = 'a' if append and os.path.exists(self.filepath) else 'w'
-            write_header = not (append and os.path.exists(self.filepath))
+            # Append only to an existing file, otherwise start a new one with a header
+            exists = append and os.path.exists(self.filepath)
             
             # Write to CSV
-            with open(self.filepath, file_mode, newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=self.columns)
-                
-                if write_header:
-                    writer.writeheader()
+            with open(self.filepath, 'a' if exists else 'w', newline='', encoding='utf-8',
+                      buffering=WRITE_BUFFER_SIZE) as csvfile:
+                if not exists:
+                    csvfile.write(self._header)
                 
-                writer.writerows(self.data)
+                _write_lines(csvfile, self._render_rows(self._cols))
             
-            logger.success(f"Saved {len(self.data)} videos to {self.filepath}")
+            self._scraped_at = None
+            logger.success(f"Saved {self._n} videos to {self.filepath}")
             return True
             
         except Exception as e:
             logger.error(f"Error saving CSV: {str(e)}")
             return False
     
-    def save_with_pandas(self, append: bool = False) -> bool:
-        """Save data using pandas (alternative method)"""
+    def save_to_parquet(self) -> bool:
+        """Save data to a Parquet file next to the CSV (requires pyarrow)"""
         try:
-            if not self.data:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+            import pyarrow.parquet as pq
+        except ImportError:
+            logger.error("pyarrow is required to save Parquet files")
+            return False
+        
+        try:
+            if not len(self):
                 logger.warning("No data to save")
                 return False
             
-            # Create DataFrame
-            df = pd.DataFrame(self.data)
-            
-            # Ensure all columns exist
-            for col in self.columns:
-                if col not in df.columns:
-                    df[col] = ""
+            self._ensure_output_dir()
+            parquet_path = os.path.splitext(self.filepath)[0] + '.parquet'
+            column_types = {
+                col: pa.uint64() if col in COUNT_COLUMNS else pa.string()
+                for col in self.columns
+            }
             
-            # Reorder columns
-            df = df[self.columns]
+            # Streamed videos are only in the CSV file: read back the rows this
+            # exporter wrote, not those of earlier runs it appended to
+            tables = []
+            if self._streamed:
+                if self._stream is not None:
+                    self._stream.flush()
+                with open(self.filepath, 'rb') as csvfile:
+                    csvfile.seek(self._stream_offset)
+                    streamed_rows = csvfile.read()
+                tables.append(pa_csv.read_csv(
+                    pa.BufferReader(self._header.encode('utf-8') + streamed_rows),
+                    convert_options=pa_csv.ConvertOptions(column_types=column_types)
+                ).select(self.columns))
             
-            # Create directory if it doesn't exist
-            os.makedirs(config.output_dir, exist_ok=True)
+            if self._n:
+                # Columns map 1:1 to Arrow arrays, no row reassembly needed
+                tables.append(pa.table({
+                    col: pa.array(values, type=column_types[col])
+                    for col, values in self._cols.items()
+                }))
             
-            # Save to CSV
-            if append and os.path.exists(self.filepath):
-                df.to_csv(self.filepath, mode='a', header=False, index=False, encoding='utf-8')
-            else:
-                df.to_csv(self.filepath, index=False, encoding='utf-8')
+            table = pa.concat_tables(tables)
+            pq.write_table(
+                table,
+                parquet_path,
+                compression='zstd',
+                use_dictionary=['account_username']
+            )
             
-            logger.success(f"Saved {len(self.data)} videos to {self.filepath} using pandas")
+            logger.success(f"Saved {table.num_rows} videos to {parquet_path}")
             return True
             
         except Exception as e:
-            logger.error(f"Error saving CSV with pandas: {str(e)}")
+            logger.error(f"Error saving Parquet: {str(e)}")
             return False
     
+    def save_with_pandas(self, append: bool = False) -> bool:
+        """Save data to CSV (kept for compatibility, delegates to save_to_csv)"""
+        return self.save_to_csv(append=append)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about collected data"""
-        if not self.data:
+        total_videos = len(self)
+        if not total_videos:
             return {
                 'total_videos': 0,
                 'total_views': 0,
@@ -167,23 +452,22 @@ class CSVExporter:
                 'total_comments': 0
             }
         
-        total_views = sum(video.get('views_count', 0) for video in self.data)
-        total_likes = sum(video.get('likes_count', 0) for video in self.data)
-        total_comments = sum(video.get('comments_count', 0) for video in self.data)
-        
         return {
-            'total_videos': len(self.data),
-            'total_views': total_views,
-            'total_likes': total_likes,
-            'total_comments': total_comments,
-            'avg_views': total_views // len(self.data) if self.data else 0,
-            'avg_likes': total_likes // len(self.data) if self.data else 0,
-            'avg_comments': total_comments // len(self.data) if self.data else 0
+            'total_videos': total_videos,
+            'total_views': self._sum_views,
+            'total_likes': self._sum_likes,
+            'total_comments': self._sum_comments,
+            'avg_views': self._sum_views // total_videos,
+            'avg_likes': self._sum_likes // total_videos,
+            'avg_comments': self._sum_comments // total_videos
         }
     
     def clear_data(self):
         """Clear collected data"""
-        self.data.clear()
+        self._reset_columns()
+        self._streamed = 0
+        self._sum_views = self._sum_likes = self._sum_comments = 0
+        self._scraped_at = None
         logger.info("Cleared collected data")
     
     def load_existing_data(self) -> bool:
@@ -193,11 +477,51 @@ class CSVExporter:
                 logger.info("No existing CSV file found")
                 return True
             
-            # Load existing data
-            df = pd.read_csv(self.filepath)
-            self.data = df.to_dict('records')
+            # Load existing data straight into the column lists
+            with open(self.filepath, newline='', encoding='utf-8') as csvfile:
+                reader = csv.reader(csvfile)
+                header = next(reader, [])
+                rows = [row for row in reader if row]  # csv.reader yields [] for blank lines
+            
+            # Pad truncated rows so every column keeps one value per row
+            width = len(header)
+            short_rows = sum(len(row) < width for row in rows)
+            if short_rows:
+                logger.warning(f"Padding {short_rows} incomplete rows in {self.filepath}")
+                rows = [row + [''] * (width - len(row)) for row in rows]
+            
+            # Build every column before touching the buffers, so a bad value
+            # leaves the current data unchanged
+            n = len(rows)
+            index = {col: i for i, col in enumerate(header)}
+            columns = {}
+            for col in self.columns:
+                i = index.get(col)
+                values = [row[i] for row in rows] if i is not None else [''] * n
+                if col in COUNT_COLUMNS:
+                    columns[col] = array(COUNT_TYPECODE, (int(value or 0) for value in values))
+                else:
+                    columns[col] = values
+            
+            # video_id and scraped_at are written unquoted, so they must not hold
+            # CSV special characters (older versions kept query strings in IDs)
+            columns['video_id'] = [
+                video_id if not video_id or video_id.isdigit() else self._extract_video_id(url)
+                for video_id, url in zip(columns['video_id'], columns['video_url'])
+            ]
+            columns['scraped_at'] = [
+                '' if _NEEDS_QUOTING(scraped_at) else scraped_at
+                for scraped_at in columns['scraped_at']
+            ]
+            
+            self._cols = columns
+            self._n = n
+            self._streamed = 0  # Streamed rows are part of the loaded file
+            self._sum_views = sum(columns['views_count'])
+            self._sum_likes = sum(columns['likes_count'])
+            self._sum_comments = sum(columns['comments_count'])
             
-            logger.info(f"Loaded {len(self.data)} existing videos from {self.filepath}")
+            logger.info(f"Loaded {self._n} existing videos from {self.filepath}")
             return True
             
         except Exception as e:
@@ -250,9 +574,7 @@ if __name__ == "__main__":
     exporter = CSVExporter("test_videos.csv")
     
     # Add sample data
-    sample_data = create_sample_data()
-    for video in sample_data:
-        exporter.add_video_data(video)
+    exporter.add_videos(create_sample_data())
     
     # Save to CSV
     exporter.save_to_csv()
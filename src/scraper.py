@@ -4,95 +4,379 @@ Scrapes video data from TikTok profiles and exports to CSV
 """
 
 import asyncio
+import json
+import os
 import random
+import re
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from typing import List, Dict, Set, Any, Optional
+
+import httpx
+from playwright.async_api import (
+    async_playwright, Browser, BrowserContext, Page, Response, Route,
+    TimeoutError as PlaywrightTimeoutError
+)
 
 from utils import (
-    logger, config, retry_handler, rate_limiter, 
-    get_tiktok_profile_url, log_config
+    get_logger, get_config, get_retry_handler, get_rate_limiter,
+    get_tiktok_profile_url, extract_video_id, log_config
 )
 from csv_exporter import CSVExporter
 
+logger = get_logger()
+config = get_config()
+retry_handler = get_retry_handler()
+rate_limiter = get_rate_limiter()
+
+# Requests never needed for scraping (thumbnails come from the img src attribute)
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Counter texts must contain at least one digit
+_HAS_DIGIT = re.compile(r'\d').search
+
+# Server-side state embedded in every TikTok page
+_REHYDRATION_RE = re.compile(
+    r'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__"[^>]*>(.+?)</script>', re.S
+)
+
+# Pagination request the profile page sends for each batch of videos
+API_ITEM_LIST_PATH = 'api/post/item_list'
+
+# Reads URL, views and thumbnail of every grid item in a single round trip
+_GRID_EXTRACT_JS = """
+(itemSelectors) => {
+    const linkSelectors = ['a[href*="/video/"]', '[data-e2e="video-link"]', 'a[href*="tiktok.com"]'];
+    const imgSelectors = ['img[data-e2e="video-cover"]', 'img[alt*="video"]', 'img'];
+    const viewSelectors = [
+        '[data-e2e="video-views"]', '.video-count', 'strong.video-count',
+        '[data-e2e="like-count"]', 'strong'
+    ];
+    
+    const findUrl = (root) => {
+        for (const selector of linkSelectors) {
+            const href = root.querySelector(selector)?.getAttribute('href');
+            if (href && href.includes('/video/')) {
+                return href.startsWith('/') ? 'https://www.tiktok.com' + href : href;
+            }
+        }
+        return null;
+    };
+    const findThumbnail = (root) => {
+        for (const selector of imgSelectors) {
+            const src = root.querySelector(selector)?.getAttribute('src');
+            if (src && (src.includes('tiktok') || src.includes('amazonaws'))) {
+                return src;
+            }
+        }
+        return '';
+    };
+    const findViews = (root) => {
+        if (!root) return null;
+        for (const selector of viewSelectors) {
+            const text = root.querySelector(selector)?.innerText;
+            if (text && /\\d/.test(text)) {
+                return text.trim();
+            }
+        }
+        return null;
+    };
+    
+    let items = [];
+    for (const selector of itemSelectors) {
+        items = document.querySelectorAll(selector);
+        if (items.length) break;
+    }
+    
+    return Array.from(items).map((item) => ({
+        video_url: findUrl(item),
+        thumbnail_url: findThumbnail(item),
+        views_count: findViews(item) || findViews(item.parentElement) || '0'
+    }));
+}
+"""
+
+
+# Playwright driver and browser shared by every scraper of the process
+_playwright = None
+_browser: Optional[Browser] = None
+_browser_lock: Optional[asyncio.Lock] = None
+
+
+def _get_browser_lock() -> asyncio.Lock:
+    """Lock guarding the lazy start of the shared driver and browser"""
+    global _browser_lock
+    if _browser_lock is None:
+        _browser_lock = asyncio.Lock()
+    return _browser_lock
+
+
+def _browser_launch_options() -> Dict[str, Any]:
+    """Browser launch options"""
+    return {
+        'headless': config.headless_mode,
+        'args': [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-blink-features=AutomationControlled',
+            '--disable-web-security',
+            '--disable-features=VizDisplayCompositor'
+        ]
+    }
+
+
+async def start_driver():
+    """Start the shared Playwright driver on first use and return the browser type to launch"""
+    global _playwright
+    
+    async with _get_browser_lock():
+        if _playwright is None:
+            _playwright = await async_playwright().start()
+    
+    if config.browser_type == 'chromium':
+        return _playwright.chromium
+    elif config.browser_type == 'firefox':
+        return _playwright.firefox
+    return _playwright.webkit
+
+
+async def start_playwright() -> Browser:
+    """Launch the shared browser on first use and return it"""
+    global _browser
+    
+    browser_type = await start_driver()
+    async with _get_browser_lock():
+        if _browser is not None:
+            return _browser
+        
+        try:
+            _browser = await browser_type.launch(**_browser_launch_options())
+            logger.success("Browser started successfully")
+            return _browser
+            
+        except Exception as e:
+            logger.error(f"Failed to start browser: {str(e)}")
+            raise
+
+
+async def stop_playwright():
+    """Close the shared browser and stop Playwright"""
+    global _playwright, _browser
+    
+    try:
+        if _browser:
+            await _browser.close()
+        if _playwright:
+            await _playwright.stop()
+        logger.info("Browser closed")
+    except Exception as e:
+        logger.error(f"Error closing browser: {str(e)}")
+    finally:
+        _browser = None
+        _playwright = None
+
 
 class TikTokScraper:
     """Main TikTok scraper class using Playwright"""
     
-    def __init__(self):
+    # Multiple selectors to try for grid items (TikTok changes frequently)
+    VIDEO_ITEM_SELECTORS = [
+        '[data-e2e="user-post-item"]',
+        '[data-e2e="user-post-item-desc"]',
+        '.tiktok-1g04lal-DivItemContainer',
+        '[data-e2e="video-feed-item"]',
+        'div[class*="DivItemContainer"]'
+    ]
+    
+    # Text selectors, each entry is a CSS union queried in one call; generic
+    # fallbacks (grid spans, the view counter, 'strong') are only queried when
+    # no specific selector matched (a union returns the first match in the page)
+    DESCRIPTION_SELECTORS = [
+        '[data-e2e="browse-video-desc"], [data-e2e="video-desc"]',
+        '.tiktok-1g04lal-DivItemContainer span',
+        '[data-e2e="user-post-item-desc"]'
+    ]
+    LIKES_SELECTORS = [', '.join([
+        '[data-e2e="browse-like-count"]',
+        '[data-e2e="like-count"]'
+    ]), '[data-e2e="video-views"]', 'strong']
+    COMMENTS_SELECTORS = [', '.join([
+        '[data-e2e="browse-comment-count"]',
+        '[data-e2e="comment-count"]'
+    ]), '[data-e2e="video-views"]', 'strong']
+    
+    # Elements that signal the page content is rendered
+    PROFILE_READY_SELECTOR = '[data-e2e="user-post-item"]'
+    VIDEO_READY_SELECTOR = '[data-e2e="browse-video-desc"], [data-e2e="browse-like-count"], [data-e2e="like-count"]'
+    
+    def __init__(self, username: Optional[str] = None, csv_filename: Optional[str] = None):
+        self.username = username or config.tiktok_username
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
-        self.csv_exporter = CSVExporter()
-        self.scraped_videos: List[str] = []  # Track scraped video URLs
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self._grid_selector: Optional[str] = None  # First grid selector that matched
+        self._api_videos: Dict[str, Dict[str, Any]] = {}  # Videos from pagination responses, by ID
+        self._has_more = True  # Pagination state reported by the server
+        self.csv_exporter = CSVExporter(csv_filename, username=self.username)
+        self.scraped_videos: Set[str] = set()  # Track scraped video URLs
         
         logger.info("TikTok Scraper initialized")
     
-    async def start_browser(self):
-        """Start Playwright browser with configuration"""
+    async def new_session(self):
+        """Open a browser context and page (shared browser, or persistent profile)"""
         try:
-            playwright = await async_playwright().start()
-            
-            # Browser launch options
-            browser_options = {
-                'headless': config.headless_mode,
-                'args': [
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor'
-                ]
+            # Context with realistic settings
+            context_options = {
+                'viewport': {'width': config.window_width, 'height': config.window_height},
+                'user_agent': USER_AGENT,
+                'locale': 'fr-FR',
+                'timezone_id': 'Europe/Paris'
             }
             
-            # Launch browser
-            if config.browser_type == 'chromium':
-                self.browser = await playwright.chromium.launch(**browser_options)
-            elif config.browser_type == 'firefox':
-                self.browser = await playwright.firefox.launch(**browser_options)
+            if config.profile_dir:
+                # Persistent profile keeps TikTok's caches and cookies between runs;
+                # it owns its own browser, one profile directory per account
+                browser_type = await start_driver()
+                launch_options = _browser_launch_options()
+                if config.block_resources:
+                    # Routing would disable the HTTP cache the profile is kept for,
+                    # so only images are skipped, by the browser itself
+                    launch_options['args'].append('--blink-settings=imagesEnabled=false')
+                
+                self.browser = None
+                self.context = await browser_type.launch_persistent_context(
+                    os.path.join(config.profile_dir, self.username),
+                    **launch_options,
+                    **context_options
+                )
             else:
-                self.browser = await playwright.webkit.launch(**browser_options)
-            
-            # Create context with realistic settings
-            self.context = await self.browser.new_context(
-                viewport={'width': config.window_width, 'height': config.window_height},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='fr-FR',
-                timezone_id='Europe/Paris'
-            )
+                self.browser = await start_playwright()
+                self.context = await self.browser.new_context(**context_options)
+            
+            # Applies to every page of the context (routing disables the HTTP cache)
+            if config.block_resources and not config.profile_dir:
+                await self.context.route("**/*", self._block_resources)
             
             # Create page
             self.page = await self.context.new_page()
+            self.page.on("response", self._on_response)
             
             # Set timeouts
             self.page.set_default_timeout(config.page_load_timeout)
             self.page.set_default_navigation_timeout(config.page_load_timeout)
             
-            logger.success("Browser started successfully")
+            logger.debug("Browser session opened")
             
         except Exception as e:
-            logger.error(f"Failed to start browser: {str(e)}")
+            logger.error(f"Failed to open browser session: {str(e)}")
             raise
     
-    async def close_browser(self):
-        """Close browser and cleanup"""
+    @staticmethod
+    async def _block_resources(route: Route):
+        """Abort heavy requests whose content is never read"""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _on_response(self, response: Response):
+        """Collect videos and pagination state from the profile's item list responses"""
+        if API_ITEM_LIST_PATH not in response.url or response.status != 200:
+            return
+        
+        try:
+            data = await response.json()
+        except Exception as e:
+            logger.debug(f"Error reading item list response: {str(e)}")
+            return
+        
+        scraped_at = datetime.now().isoformat()
+        for item in data.get('itemList') or []:
+            video = self._video_from_item(item, scraped_at)
+            if video:
+                self._api_videos.setdefault(video['video_id'], video)
+        
+        self._has_more = bool(data.get('hasMore', True))
+        logger.debug(f"Item list response: {len(self._api_videos)} videos, has more: {self._has_more}")
+    
+    def _video_from_item(self, item: Dict[str, Any], scraped_at: str) -> Optional[Dict[str, Any]]:
+        """Build a complete video record from an item list entry"""
+        video_id = str(item.get('id') or '')
+        if not video_id:
+            return None
+        
+        username = (item.get('author') or {}).get('uniqueId') or self.username
+        return {
+            'video_id': video_id,
+            'video_url': f"https://www.tiktok.com/@{username}/video/{video_id}",
+            'views_count': str((item.get('stats') or {}).get('playCount', 0)),
+            'thumbnail_url': (item.get('video') or {}).get('cover', ''),
+            'account_username': self.username,
+            'scraped_at': scraped_at,
+            **self._item_details(item)
+        }
+    
+    @staticmethod
+    def _item_details(item: Dict[str, Any]) -> Dict[str, str]:
+        """Description, likes and comments of a TikTok item"""
+        stats = item.get('stats') or {}
+        return {
+            'description': item.get('desc', ''),
+            'likes_count': str(stats.get('diggCount', 0)),
+            'comments_count': str(stats.get('commentCount', 0))
+        }
+    
+    async def open_http_client(self):
+        """Open an HTTP client sharing the browser session cookies"""
+        cookies = httpx.Cookies()
+        for cookie in await self.context.cookies():
+            cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+        
+        self.http_client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT, 'Referer': 'https://www.tiktok.com/'},
+            cookies=cookies,
+            timeout=config.page_load_timeout / 1000,
+            follow_redirects=True
+        )
+    
+    async def close_session(self):
+        """Close the browser context of this scraper (the shared browser stays open)"""
         try:
+            if self.http_client:
+                await self.http_client.aclose()
+                self.http_client = None
             if self.context:
                 await self.context.close()
-            if self.browser:
-                await self.browser.close()
-            logger.info("Browser closed")
+                self.context = None
+                self.page = None
+            logger.debug("Browser session closed")
         except Exception as e:
-            logger.error(f"Error closing browser: {str(e)}")
+            logger.error(f"Error closing browser session: {str(e)}")
     
     async def navigate_to_profile(self, username: str) -> bool:
         """Navigate to TikTok profile"""
         try:
             profile_url = get_tiktok_profile_url(username)
             logger.info(f"Navigating to profile: {profile_url}")
+            self._grid_selector = None
+            self._api_videos = {}
+            self._has_more = True
+            
+            await retry_handler.execute_with_retry(
+                self.page.goto, profile_url, wait_until='domcontentloaded'
+            )
             
-            await self.page.goto(profile_url, wait_until='networkidle')
-            await asyncio.sleep(2)  # Wait for page to stabilize
+            # Wait for the video grid rather than for the network to go idle
+            try:
+                await self.page.wait_for_selector(
+                    self.PROFILE_READY_SELECTOR,
+                    state='attached',
+                    timeout=config.element_wait_timeout
+                )
+            except PlaywrightTimeoutError:
+                logger.debug("Video grid not found before timeout")
             
             # Check if profile exists
             if "User not found" in await self.page.content():
@@ -111,11 +395,16 @@ class TikTokScraper:
         try:
             logger.info("Starting to scroll and load videos...")
             
-            videos_loaded = 0
+            videos_loaded = await self.count_loaded_videos()
             no_new_videos_count = 0
             max_no_new_videos = 3
             
             while videos_loaded < config.max_videos and no_new_videos_count < max_no_new_videos:
+                # The item list responses tell when the profile is exhausted
+                if not self._has_more:
+                    logger.debug("Server reported no more videos")
+                    break
+                
                 # Get current video count
                 initial_count = len(await self.get_visible_video_elements())
                 
@@ -124,12 +413,19 @@ class TikTokScraper:
                 await asyncio.sleep(config.scroll_delay)
                 
                 # Wait for new content to load
-                await self.page.wait_for_timeout(2000)
+                try:
+                    await self.page.wait_for_function(
+                        "([selector, count]) => document.querySelectorAll(selector).length > count",
+                        arg=[self._grid_selector or self.PROFILE_READY_SELECTOR, initial_count],
+                        timeout=config.scroll_timeout
+                    )
+                except PlaywrightTimeoutError:
+                    logger.debug("No new video items after scrolling")
                 
                 # Check if new videos were loaded
-                final_count = len(await self.get_visible_video_elements())
+                final_count = await self.count_loaded_videos()
                 
-                if final_count > initial_count:
+                if final_count > videos_loaded:
                     videos_loaded = final_count
                     no_new_videos_count = 0
                     logger.info(f"Loaded {videos_loaded} videos so far...")
@@ -147,25 +443,22 @@ class TikTokScraper:
             logger.error(f"Error scrolling and loading videos: {str(e)}")
             return 0
     
+    async def count_loaded_videos(self) -> int:
+        """Number of videos loaded so far, from the grid or the item list responses"""
+        return max(len(await self.get_visible_video_elements()), len(self._api_videos))
+    
     async def get_visible_video_elements(self) -> List[Any]:
         """Get all visible video elements on the page"""
         try:
-            # Multiple selectors to try (TikTok changes frequently)
-            selectors = [
-                '[data-e2e="user-post-item"]',
-                '[data-e2e="user-post-item-desc"]',
-                '.tiktok-1g04lal-DivItemContainer',
-                '[data-e2e="video-feed-item"]',
-                'div[class*="DivItemContainer"]',
-                # Nouveaux sélecteurs pour la grille
-                'div[class*="DivItemContainer"]',
-                'div[data-e2e="user-post-item"]'
-            ]
+            # Once a selector matched on this page, the others are never needed
+            if self._grid_selector:
+                return await self.page.query_selector_all(self._grid_selector)
             
-            for selector in selectors:
+            for selector in self.VIDEO_ITEM_SELECTORS:
                 elements = await self.page.query_selector_all(selector)
                 if elements:
                     logger.debug(f"Found {len(elements)} video elements with selector: {selector}")
+                    self._grid_selector = selector
                     return elements
             
             logger.warning("No video elements found with any selector")
@@ -175,169 +468,64 @@ class TikTokScraper:
             logger.error(f"Error getting video elements: {str(e)}")
             return []
     
-    async def extract_video_data(self, video_element: Any) -> Optional[Dict[str, Any]]:
-        """Extract data from a single video element (grid view only)"""
+    async def extract_grid_videos(self) -> List[Dict[str, Any]]:
+        """Extract grid data (URL, views, thumbnail) of all loaded videos in one call"""
         try:
-            video_data = {}
-            
-            # Extract video URL
-            video_url = await self.extract_video_url(video_element)
-            if not video_url:
-                return None
-            
-            video_data['video_id'] = video_url.split('/')[-1]
-            video_data['video_url'] = video_url
-            
-            # Extract views from grid (only available on profile page)
-            views_count = await self.extract_views_from_grid(video_element)
-            video_data['views_count'] = views_count
-            
-            # Extract thumbnail
-            thumbnail = await self.extract_thumbnail(video_element)
-            video_data['thumbnail_url'] = thumbnail
-            
-            # Set account username
-            video_data['account_username'] = config.tiktok_username
-            
-            # Set timestamp
-            video_data['scraped_at'] = datetime.now().isoformat()
-            
-            # Initialize other fields (will be filled when clicking on video)
-            video_data['description'] = ""
-            video_data['likes_count'] = "0"
-            video_data['comments_count'] = "0"
-            
-            logger.debug(f"Added video data: {video_data['video_id']}")
-            return video_data
-            
+            selectors = [self._grid_selector] if self._grid_selector else self.VIDEO_ITEM_SELECTORS
+            items = await self.page.evaluate(_GRID_EXTRACT_JS, selectors)
         except Exception as e:
-            logger.error(f"Error extracting video data: {str(e)}")
-            return None
+            logger.error(f"Error extracting grid data: {str(e)}")
+            return []
+        
+        scraped_at = datetime.now().isoformat()
+        videos = []
+        for item in items:
+            video_url = item['video_url']
+            if not video_url:
+                continue
+            
+            videos.append({
+                'video_id': extract_video_id(video_url) or "",
+                'video_url': video_url,
+                'views_count': item['views_count'],
+                'thumbnail_url': item['thumbnail_url'],
+                'account_username': self.username,
+                'scraped_at': scraped_at,
+                # Filled from the video page
+                'description': "",
+                'likes_count': "0",
+                'comments_count': "0"
+            })
+        
+        logger.debug(f"Extracted grid data of {len(videos)} videos")
+        return videos
     
-    async def extract_video_url(self, element: Any) -> Optional[str]:
-        """Extract video URL from element"""
-        try:
-            # Try multiple selectors for video link
-            link_selectors = [
-                'a[href*="/video/"]',
-                '[data-e2e="video-link"]',
-                'a[href*="tiktok.com"]'
-            ]
-            
-            for selector in link_selectors:
-                link_element = await element.query_selector(selector)
-                if link_element:
-                    href = await link_element.get_attribute('href')
-                    if href and '/video/' in href:
-                        if href.startswith('/'):
-                            return f"https://www.tiktok.com{href}"
-                        return href
-            
-            return None
-            
-        except Exception as e:
-            logger.debug(f"Error extracting video URL: {str(e)}")
-            return None
+    async def _extract_text(self, root: Any, selectors: List[str], numeric: bool = False) -> Optional[str]:
+        """Text of the first match, trying each selector union with a single query"""
+        for selector in selectors:
+            element = await root.query_selector(selector)
+            if element:
+                text = (await element.inner_text()).strip()
+                if text and (not numeric or _HAS_DIGIT(text)):
+                    return text
+        
+        return None
     
     async def extract_description(self, element: Any) -> str:
         """Extract video description"""
         try:
-            desc_selectors = [
-                '[data-e2e="browse-video-desc"]',
-                '[data-e2e="video-desc"]',
-                '.tiktok-1g04lal-DivItemContainer span',
-                '[data-e2e="user-post-item-desc"]'
-            ]
-            
-            for selector in desc_selectors:
-                desc_element = await element.query_selector(selector)
-                if desc_element:
-                    text = await desc_element.inner_text()
-                    if text and text.strip():
-                        return text.strip()
-            
-            return ""
+            text = await self._extract_text(element, self.DESCRIPTION_SELECTORS)
+            return text or ""
             
         except Exception as e:
             logger.debug(f"Error extracting description: {str(e)}")
             return ""
     
-    async def extract_thumbnail(self, element: Any) -> str:
-        """Extract thumbnail URL"""
-        try:
-            img_selectors = [
-                'img[data-e2e="video-cover"]',
-                'img[alt*="video"]',
-                'img'
-            ]
-            
-            for selector in img_selectors:
-                img_element = await element.query_selector(selector)
-                if img_element:
-                    src = await img_element.get_attribute('src')
-                    if src and ('tiktok' in src or 'amazonaws' in src):
-                        return src
-            
-            return ""
-            
-        except Exception as e:
-            logger.debug(f"Error extracting thumbnail: {str(e)}")
-            return ""
-    
-    async def extract_views_from_grid(self, element: Any) -> str:
-        """Extract view count"""
-        try:
-            # Essayer de trouver les vues dans le conteneur parent ou proche
-            view_selectors = [
-                '[data-e2e="video-views"]',
-                '.video-count',
-                'strong.video-count',
-                '[data-e2e="like-count"]',
-                'strong'
-            ]
-            
-            # Chercher dans l'élément actuel
-            for selector in view_selectors:
-                view_element = await element.query_selector(selector)
-                if view_element:
-                    text = await view_element.inner_text()
-                    if text and any(char.isdigit() for char in text):
-                        return text.strip()
-            
-            # Chercher dans le conteneur parent
-            parent = await element.query_selector('xpath=..')
-            if parent:
-                for selector in view_selectors:
-                    view_element = await parent.query_selector(selector)
-                    if view_element:
-                        text = await view_element.inner_text()
-                        if text and any(char.isdigit() for char in text):
-                            return text.strip()
-            
-            return "0"
-            
-        except Exception as e:
-            logger.debug(f"Error extracting views: {str(e)}")
-            return "0"
-    
     async def extract_likes(self, element: Any) -> str:
         """Extract like count"""
         try:
-            like_selectors = [
-                '[data-e2e="browse-like-count"]',
-                '[data-e2e="like-count"]',
-                '[data-e2e="video-views"]',
-                'strong'
-            ]
-            
-            for selector in like_selectors:
-                like_element = await element.query_selector(selector)
-                if like_element:
-                    text = await like_element.inner_text()
-                    if text and any(char.isdigit() for char in text):
-                        return text.strip()
-            
-            return "0"
+            text = await self._extract_text(element, self.LIKES_SELECTORS, numeric=True)
+            return text or "0"
             
         except Exception as e:
             logger.debug(f"Error extracting likes: {str(e)}")
@@ -346,47 +534,74 @@ class TikTokScraper:
     async def extract_comments(self, element: Any) -> str:
         """Extract comment count"""
         try:
-            comment_selectors = [
-                '[data-e2e="browse-comment-count"]',
-                '[data-e2e="comment-count"]',
-                '[data-e2e="video-views"]',
-                'strong'
-            ]
-            
-            for selector in comment_selectors:
-                comment_element = await element.query_selector(selector)
-                if comment_element:
-                    text = await comment_element.inner_text()
-                    if text and any(char.isdigit() for char in text):
-                        return text.strip()
-            
-            return "0"
+            text = await self._extract_text(element, self.COMMENTS_SELECTORS, numeric=True)
+            return text or "0"
             
         except Exception as e:
             logger.debug(f"Error extracting comments: {str(e)}")
             return "0"
     
     async def extract_data_from_individual_video(self, video_url: str) -> Dict[str, str]:
-        """Click on video and extract description, likes, comments"""
+        """Get description, likes, comments of a video (page JSON first, browser as fallback)"""
+        if self.http_client:
+            details = await self.fetch_video_details(video_url)
+            if details:
+                return details
+            logger.debug(f"Falling back to browser extraction: {video_url}")
+        
+        return await self.extract_data_from_video_page(video_url)
+    
+    async def fetch_video_details(self, video_url: str) -> Optional[Dict[str, str]]:
+        """Fetch description, likes, comments from the JSON embedded in the video page"""
+        try:
+            response = await self.http_client.get(video_url)
+            response.raise_for_status()
+            
+            match = _REHYDRATION_RE.search(response.text)
+            if not match:
+                logger.debug(f"No embedded video data in {video_url}")
+                return None
+            
+            data = json.loads(match.group(1))
+            item = data['__DEFAULT_SCOPE__']['webapp.video-detail']['itemInfo']['itemStruct']
+            return self._item_details(item)
+            
+        except Exception as e:
+            logger.debug(f"Error fetching video details: {str(e)}")
+            return None
+    
+    async def extract_data_from_video_page(self, video_url: str) -> Dict[str, str]:
+        """Open video in its own page and extract description, likes, comments"""
+        video_page: Optional[Page] = None
         try:
             logger.debug(f"Extracting data from individual video: {video_url}")
             
+            # Separate page so the profile grid stays loaded
+            video_page = await self.context.new_page()
+            video_page.set_default_timeout(config.page_load_timeout)
+            
             # Navigate to the video
-            await self.page.goto(video_url, wait_until='networkidle')
-            await asyncio.sleep(2)  # Wait for page to load
+            await retry_handler.execute_with_retry(
+                video_page.goto, video_url, wait_until='domcontentloaded'
+            )
+            
+            # Wait for the description or counters rather than for the network to go idle
+            try:
+                await video_page.wait_for_selector(
+                    self.VIDEO_READY_SELECTOR,
+                    timeout=config.element_wait_timeout
+                )
+            except PlaywrightTimeoutError:
+                logger.debug(f"Video details not found before timeout: {video_url}")
             
             # Extract description
-            description = await self.extract_description_from_video()
+            description = await self.extract_description_from_video(video_page)
             
             # Extract likes
-            likes = await self.extract_likes_from_video()
+            likes = await self.extract_likes_from_video(video_page)
             
             # Extract comments
-            comments = await self.extract_comments_from_video()
-            
-            # Go back to profile
-            await self.page.go_back()
-            await asyncio.sleep(1)
+            comments = await self.extract_comments_from_video(video_page)
             
             return {
                 'description': description,
@@ -401,84 +616,61 @@ class TikTokScraper:
                 'likes_count': "0",
                 'comments_count': "0"
             }
+        finally:
+            if video_page:
+                await video_page.close()
     
-    async def extract_description_from_video(self) -> str:
+    async def extract_description_from_video(self, page: Page) -> str:
         """Extract description from individual video page"""
         try:
-            desc_selectors = [
-                '[data-e2e="browse-video-desc"]',
-                '[data-e2e="video-desc"]',
-                '.tiktok-1g04lal-DivItemContainer span',
-                '[data-e2e="user-post-item-desc"]'
-            ]
-            
-            for selector in desc_selectors:
-                desc_element = await self.page.query_selector(selector)
-                if desc_element:
-                    text = await desc_element.inner_text()
-                    if text and text.strip():
-                        return text.strip()
-            
-            return ""
+            text = await self._extract_text(page, self.DESCRIPTION_SELECTORS)
+            return text or ""
             
         except Exception as e:
             logger.debug(f"Error extracting description from video: {str(e)}")
             return ""
     
-    async def extract_likes_from_video(self) -> str:
+    async def extract_likes_from_video(self, page: Page) -> str:
         """Extract likes from individual video page"""
         try:
-            like_selectors = [
-                '[data-e2e="browse-like-count"]',
-                '[data-e2e="like-count"]',
-                '[data-e2e="video-views"]',
-                'strong'
-            ]
-            
-            for selector in like_selectors:
-                like_element = await self.page.query_selector(selector)
-                if like_element:
-                    text = await like_element.inner_text()
-                    if text and any(char.isdigit() for char in text):
-                        return text.strip()
-            
-            return "0"
+            text = await self._extract_text(page, self.LIKES_SELECTORS, numeric=True)
+            return text or "0"
             
         except Exception as e:
             logger.debug(f"Error extracting likes from video: {str(e)}")
             return "0"
     
-    async def extract_comments_from_video(self) -> str:
+    async def extract_comments_from_video(self, page: Page) -> str:
         """Extract comments from individual video page"""
         try:
-            comment_selectors = [
-                '[data-e2e="browse-comment-count"]',
-                '[data-e2e="comment-count"]',
-                '[data-e2e="video-views"]',
-                'strong'
-            ]
-            
-            for selector in comment_selectors:
-                comment_element = await self.page.query_selector(selector)
-                if comment_element:
-                    text = await comment_element.inner_text()
-                    if text and any(char.isdigit() for char in text):
-                        return text.strip()
-            
-            return "0"
+            text = await self._extract_text(page, self.COMMENTS_SELECTORS, numeric=True)
+            return text or "0"
             
         except Exception as e:
             logger.debug(f"Error extracting comments from video: {str(e)}")
             return "0"
     
+    async def _scrape_video(self, video_data: Dict[str, Any], semaphore: asyncio.Semaphore):
+        """Complete a grid video with its page data and write it out, bounded by the semaphore"""
+        async with semaphore:
+            additional_data = await self.extract_data_from_individual_video(video_data['video_url'])
+            
+            # Update video data with additional information
+            video_data.update(additional_data)
+            if self.csv_exporter.add_video_data(video_data):
+                self.scraped_videos.add(video_data['video_url'])
+            
+            # Rate limiting between extractions
+            await asyncio.sleep(config.extraction_delay)
+    
     async def scrape_profile(self, username: str) -> bool:
         """Main scraping method"""
         try:
             logger.info(f"Starting to scrape profile: @{username}")
             log_config()
             
-            # Start browser
-            await self.start_browser()
+            # Open a browser context on the shared browser
+            await self.new_session()
             
             # Navigate to profile
             if not await self.navigate_to_profile(username):
@@ -490,50 +682,69 @@ class TikTokScraper:
                 logger.warning("No videos found on profile")
                 return False
             
-            # Extract data from all videos
-            video_elements = await self.get_visible_video_elements()
-            logger.info(f"Extracting data from {len(video_elements)} videos...")
+            # Item list responses hold complete video data; grid videos they
+            # missed (unread or unparseable responses) are completed from their pages
+            grid_videos = [
+                video_data for video_data in await self.extract_grid_videos()
+                if video_data['video_id'] not in self._api_videos
+            ]
             
-            scraped_count = 0
-            for i in range(config.max_videos):
-                try:
-                    # Re-get video elements after each navigation (DOM elements become stale)
-                    current_video_elements = await self.get_visible_video_elements()
-                    if i >= len(current_video_elements):
-                        logger.warning(f"Not enough videos found. Requested: {config.max_videos}, Available: {len(current_video_elements)}")
-                        break
-                    
-                    video_element = current_video_elements[i]
-                    video_data = await self.extract_video_data(video_element)
-                    
-                    if video_data and video_data.get('video_url'):
-                        # Check if already scraped
-                        if video_data['video_url'] not in self.scraped_videos:
-                            # Extract additional data by clicking on the video
-                            additional_data = await self.extract_data_from_individual_video(video_data['video_url'])
-                            
-                            # Update video data with additional information
-                            video_data['description'] = additional_data['description']
-                            video_data['likes_count'] = additional_data['likes_count']
-                            video_data['comments_count'] = additional_data['comments_count']
-                            
-                            self.csv_exporter.add_video_data(video_data)
-                            self.scraped_videos.append(video_data['video_url'])
-                            scraped_count += 1
-                            
-                            logger.debug(f"Scraped video {scraped_count}/{config.max_videos}")
+            videos: Dict[str, Dict[str, Any]] = {}
+            for video_data in [*self._api_videos.values(), *grid_videos]:
+                if len(videos) >= config.max_videos:
+                    break
+                
+                # Check if already scraped
+                video_url = video_data['video_url']
+                if video_url not in self.scraped_videos and video_url not in videos:
+                    videos[video_url] = video_data
+            
+            if len(videos) < config.max_videos:
+                logger.warning(f"Not enough videos found. Requested: {config.max_videos}, Available: {len(videos)}")
+            
+            # Leave the existing CSV untouched when there is nothing to write
+            if not videos:
+                logger.error("No data was scraped")
+                return False
+            
+            complete = {
+                video_url: video_data for video_url, video_data in videos.items()
+                if video_data['video_id'] in self._api_videos
+            }
+            pending = {
+                video_url: video_data for video_url, video_data in videos.items()
+                if video_url not in complete
+            }
+            
+            # Later scrapes of this scraper add to the rows its earlier scrapes wrote
+            self.csv_exporter.open_stream(append=bool(self.scraped_videos))
+            try:
+                if complete:
+                    logger.info(f"Saving {len(complete)} videos from the item list responses...")
+                    for video_url, video_data in complete.items():
+                        if self.csv_exporter.add_video_data(video_data):
+                            self.scraped_videos.add(video_url)
+                
+                if pending:
+                    # Video details are fetched over HTTP with the browser session cookies
+                    await self.open_http_client()
                     
-                    # Rate limiting between extractions
-                    await asyncio.sleep(config.extraction_delay)
+                    # Extract additional data from the video pages concurrently; each row
+                    # is written to the CSV as soon as its video is done
+                    logger.info(f"Extracting data from {len(pending)} videos...")
+                    semaphore = asyncio.Semaphore(config.max_concurrency)
+                    results = await asyncio.gather(
+                        *(self._scrape_video(video_data, semaphore) for video_data in pending.values()),
+                        return_exceptions=True
+                    )
                     
-                except Exception as e:
-                    logger.error(f"Error processing video {i}: {str(e)}")
-                    continue
+                    for video_url, result in zip(pending, results):
+                        if isinstance(result, Exception):
+                            logger.error(f"Error processing video {video_url}: {str(result)}")
+            finally:
+                self.csv_exporter.close_stream()
             
-            # Save to CSV
-            if self.csv_exporter.data:
-                self.csv_exporter.save_to_csv()
-                
+            if len(self.csv_exporter):
                 # Print statistics
                 stats = self.csv_exporter.get_stats()
                 logger.success(f"Scraping completed! Scraped {stats['total_videos']} videos")
@@ -550,7 +761,23 @@ class TikTokScraper:
             logger.error(f"Error during scraping: {str(e)}")
             return False
         finally:
-            await self.close_browser()
+            await self.close_session()
+
+
+async def scrape_profiles(usernames: List[str]) -> Dict[str, bool]:
+    """Scrape several profiles concurrently, each in its own context of the shared browser"""
+    scrapers = {
+        username: TikTokScraper(
+            username,
+            f"{username}_{config.csv_filename}" if len(usernames) > 1 else None
+        )
+        for username in usernames
+    }
+    
+    results = await asyncio.gather(
+        *(scraper.scrape_profile(username) for username, scraper in scrapers.items())
+    )
+    return dict(zip(scrapers, results))
 
 
 async def main():
@@ -568,7 +795,16 @@ async def main():
         logger.info("Scraping interrupted by user")
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
+    finally:
+        await stop_playwright()
 
 
 if __name__ == "__main__":
+    # Faster event loop when available (not supported on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())
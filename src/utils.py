@@ -4,13 +4,20 @@ Handles logging, configuration, error handling, and common operations
 """
 
 import os
+import re
+import sys
+import queue
+import atexit
 import logging
+import logging.handlers
 import asyncio
 import random
+import functools
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from colorama import init, Fore, Style
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 # Initialize colorama for colored output
 init(autoreset=True)
@@ -18,6 +25,38 @@ init(autoreset=True)
 # Load environment variables
 load_dotenv()
 
+# TikTok number format: "1.2K", "5.5M", "1,234"
+_NUM_RE = re.compile(r'^([\d.]+)([KMB]?)$', re.I)
+_NUM_STRIP = str.maketrans('', '', ', ')
+_MULT = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+
+# TikTok video ID: ".../video/<id>", "?item_id=<id>", a long numeric path segment, or a bare ID
+_VIDEO_ID_RE = re.compile(
+    r'/video/(\d+)|[?&]item_id=(\d{10,})|(?:^|/)(\d{11,})(?=[/?#]|$)|^(\d{10,})$'
+)
+
+
+class ColoredFormatter(logging.Formatter):
+    """Formatter coloring records by level, used for the console only"""
+    
+    LEVEL_COLORS = {
+        'INFO': Fore.GREEN,
+        'WARNING': Fore.YELLOW,
+        'ERROR': Fore.RED
+    }
+    
+    def __init__(self, fmt: str, use_color: bool = True):
+        super().__init__(fmt)
+        self.use_color = use_color
+    
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        if not self.use_color:
+            return message
+        
+        color = getattr(record, 'color', None) or self.LEVEL_COLORS.get(record.levelname)
+        return f"{color}{message}{Style.RESET_ALL}" if color else message
+
 
 class Logger:
     """Custom logger with colored output and file logging"""
@@ -29,9 +68,10 @@ class Logger:
         # Create logs directory if it doesn't exist
         os.makedirs("logs", exist_ok=True)
         
-        # File handler
+        # File handler (file opened on first record)
         file_handler = logging.FileHandler(
-            f"logs/scraper_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            f"logs/scraper_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log",
+            delay=True
         )
         file_handler.setLevel(logging.DEBUG)
         
@@ -39,36 +79,49 @@ class Logger:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
         
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        # Formatters: plain text in the log file, colors on an interactive console
+        log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        file_handler.setFormatter(logging.Formatter(log_format))
+        console_handler.setFormatter(
+            ColoredFormatter(log_format, use_color=sys.stderr.isatty())
         )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
         
-        # Add handlers
-        self.logger.addHandler(file_handler)
+        # Add handlers: file writes happen on a background thread fed by a queue
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
         self.logger.addHandler(console_handler)
+        
+        self._listener = logging.handlers.QueueListener(
+            log_queue, file_handler, respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self.close)
+    
+    def close(self):
+        """Write pending records to the log file and stop the background thread"""
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
     
     def info(self, message: str):
-        """Log info message with green color"""
-        self.logger.info(f"{Fore.GREEN}{message}{Style.RESET_ALL}")
+        """Log info message (green on console)"""
+        self.logger.info(message)
     
     def warning(self, message: str):
-        """Log warning message with yellow color"""
-        self.logger.warning(f"{Fore.YELLOW}{message}{Style.RESET_ALL}")
+        """Log warning message (yellow on console)"""
+        self.logger.warning(message)
     
     def error(self, message: str):
-        """Log error message with red color"""
-        self.logger.error(f"{Fore.RED}{message}{Style.RESET_ALL}")
+        """Log error message (red on console)"""
+        self.logger.error(message)
     
     def debug(self, message: str):
         """Log debug message"""
         self.logger.debug(message)
     
     def success(self, message: str):
-        """Log success message with bright green color"""
-        self.logger.info(f"{Fore.GREEN}{Style.BRIGHT}{message}{Style.RESET_ALL}")
+        """Log success message (bright green on console)"""
+        self.logger.info(message, extra={'color': Fore.GREEN + Style.BRIGHT})
 
 
 class Config:
@@ -80,6 +133,7 @@ class Config:
         self.scroll_delay = int(os.getenv("SCROLL_DELAY", "3"))
         self.extraction_delay = int(os.getenv("EXTRACTION_DELAY", "1"))
         self.max_retries = int(os.getenv("MAX_RETRIES", "5"))
+        self.max_concurrency = int(os.getenv("MAX_CONCURRENCY", "10"))
         
         # Timeouts
         self.page_load_timeout = int(os.getenv("PAGE_LOAD_TIMEOUT", "30")) * 1000
@@ -96,6 +150,8 @@ class Config:
         self.browser_type = os.getenv("BROWSER_TYPE", "chromium")
         self.window_width = int(os.getenv("WINDOW_WIDTH", "1920"))
         self.window_height = int(os.getenv("WINDOW_HEIGHT", "1080"))
+        self.profile_dir = os.getenv("PROFILE_DIR", "")
+        self.block_resources = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
         
         # Rate limiting
         self.min_delay = int(os.getenv("MIN_DELAY_BETWEEN_ACTIONS", "2"))
@@ -106,11 +162,24 @@ class Config:
 
 
 class RetryHandler:
-    """Handles retry logic with exponential backoff"""
+    """Handles retry logic with capped, jittered exponential backoff"""
     
-    def __init__(self, max_retries: int = 5, base_delay: float = 1.0):
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 10.0, jitter: float = 0.2, timeout_delay: float = 0.2):
         self.max_retries = max_retries
         self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.timeout_delay = timeout_delay
+    
+    def get_delay(self, attempt: int, error: Exception) -> float:
+        """Delay before the next attempt"""
+        # Timeouts are usually a transient DOM/network delay: retry right away
+        if isinstance(error, (PlaywrightTimeoutError, asyncio.TimeoutError)):
+            return self.timeout_delay
+        
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
     
     async def execute_with_retry(self, func, *args, **kwargs):
         """Execute function with retry logic"""
@@ -122,12 +191,13 @@ class RetryHandler:
             except Exception as e:
                 last_exception = e
                 if attempt < self.max_retries - 1:
-                    delay = self.base_delay * (2 ** attempt)
+                    delay = self.get_delay(attempt, e)
+                    logger = get_logger()
                     logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-                    logger.info(f"Retrying in {delay} seconds...")
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
                     await asyncio.sleep(delay)
                 else:
-                    logger.error(f"All {self.max_retries} attempts failed")
+                    get_logger().error(f"All {self.max_retries} attempts failed")
         
         raise last_exception
 
@@ -138,11 +208,19 @@ class RateLimiter:
     def __init__(self, min_delay: int = 2, max_delay: int = 5):
         self.min_delay = min_delay
         self.max_delay = max_delay
+        self._last = 0.0  # Event loop time of the previous wait
     
     async def wait(self):
-        """Wait for a random delay between min and max delay"""
-        delay = random.uniform(self.min_delay, self.max_delay)
-        await asyncio.sleep(delay)
+        """Wait until a random delay between min and max delay has passed since the last wait"""
+        loop = asyncio.get_running_loop()
+        target_gap = random.uniform(self.min_delay, self.max_delay)
+        
+        # Time spent by the caller since the last wait counts towards the delay
+        to_sleep = self._last + target_gap - loop.time()
+        if to_sleep > 0:
+            await asyncio.sleep(to_sleep)
+        
+        self._last = loop.time()
 
 
 def clean_text(text: str) -> str:
@@ -164,18 +242,16 @@ def format_number(text: str) -> int:
     if not text:
         return 0
     
-    text = text.upper().replace(",", "").replace(" ", "")
+    match = _NUM_RE.match(text.translate(_NUM_STRIP))
+    if not match:
+        return 0
     
+    number, suffix = match.groups()
     try:
-        if "K" in text:
-            return int(float(text.replace("K", "")) * 1000)
-        elif "M" in text:
-            return int(float(text.replace("M", "")) * 1000000)
-        elif "B" in text:
-            return int(float(text.replace("B", "")) * 1000000000)
-        else:
-            return int(text)
-    except (ValueError, TypeError):
+        if suffix:
+            return int(float(number) * _MULT[suffix.upper()])
+        return int(number)
+    except ValueError:
         return 0
 
 
@@ -184,39 +260,53 @@ def extract_video_id(url: str) -> Optional[str]:
     if not url:
         return None
     
-    try:
-        # Handle different TikTok URL formats
-        if "/video/" in url:
-            return url.split("/video/")[1].split("?")[0]
-        elif "tiktok.com" in url and "/" in url:
-            parts = url.split("/")
-            for i, part in enumerate(parts):
-                if part.isdigit() and len(part) > 10:
-                    return part
-    except Exception:
-        pass
+    match = _VIDEO_ID_RE.search(url)
+    if not match:
+        return None
     
-    return None
+    return next(group for group in match.groups() if group)
 
 
+@functools.lru_cache(maxsize=256)
 def get_tiktok_profile_url(username: str) -> str:
     """Generate TikTok profile URL"""
-    username = username.replace("@", "")
-    return f"https://www.tiktok.com/@{username}"
+    return f"https://www.tiktok.com/@{username.replace('@', '')}"
+
+
+# Shared instances, built on first use rather than at import time
+@functools.cache
+def get_logger() -> Logger:
+    """Get the shared logger"""
+    return Logger()
+
+
+@functools.cache
+def get_config() -> Config:
+    """Get the shared configuration"""
+    return Config()
+
+
+@functools.cache
+def get_retry_handler() -> RetryHandler:
+    """Get the shared retry handler"""
+    return RetryHandler(get_config().max_retries)
 
 
-# Global instances
-logger = Logger()
-config = Config()
-retry_handler = RetryHandler(config.max_retries)
-rate_limiter = RateLimiter(config.min_delay, config.max_delay)
+@functools.cache
+def get_rate_limiter() -> RateLimiter:
+    """Get the shared rate limiter"""
+    config = get_config()
+    return RateLimiter(config.min_delay, config.max_delay)
 
 
 def log_config():
     """Log current configuration"""
+    logger = get_logger()
+    config = get_config()
     logger.info("=== Configuration ===")
     logger.info(f"Target account: @{config.tiktok_username}")
     logger.info(f"Max videos: {config.max_videos}")
+    logger.info(f"Max concurrency: {config.max_concurrency}")
     logger.info(f"Headless mode: {config.headless_mode}")
     logger.info(f"Output directory: {config.output_dir}")
     logger.info(f"CSV filename: {config.csv_filename}")